@@ -88,6 +88,14 @@ class DBProxy:
     # with .all()
     execute = all
 
+    # Fixed queries
+    ###################
+
+    def fixed_query(self, sql: str) -> FixedQuery:
+        "Return a handle for a read-only query that will be run repeatedly."
+        assert not sql.strip().lower().startswith(("insert", "update", "delete"))
+        return FixedQuery(self._backend, sql)
+
     # Updates
     ################
 
@@ -100,6 +108,28 @@ class DBProxy:
         self._backend.db_execute_many(sql, list_args)
 
 
+class FixedQuery:
+    """A read-only query with fixed SQL text, taking positional args only.
+
+    Calls skip the statement inspection and named argument handling that
+    DBProxy does on each query. Nothing is compiled up front; the backend's
+    statement cache is keyed on the SQL text as with any other query."""
+
+    def __init__(self, backend: anki._backend.RustBackend, sql: str) -> None:
+        self._backend = backend
+        self.sql = sql
+
+    def all(self, *args: ValueForDB) -> List[Row]:
+        return self._backend.db_query(self.sql, args, False)
+
+    def scalar(self, *args: ValueForDB) -> ValueFromDB:
+        rows = self._backend.db_query(self.sql, args, True)
+        if rows:
+            return rows[0][0]
+        else:
+            return None
+
+
 # convert kwargs to list format
 def emulate_named_args(
     sql: str, args: Tuple, kwargs: Dict[str, Any]
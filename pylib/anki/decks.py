@@ -252,6 +252,7 @@ class DeckManager:
             )
         except DeckIsFilteredError as exc:
             raise DeckRenameError("deck was filtered") from exc
+        self._invalidate_sched_config()
 
     def rename(self, g: Deck, newName: str) -> None:
         "Rename deck prefix to NAME if not exists. Updates children."
@@ -310,6 +311,7 @@ class DeckManager:
         conf["id"] = self.col._backend.add_or_update_deck_config_legacy(
             config=to_json_bytes(conf), preserve_usn_and_mtime=preserve_usn
         )
+        self._invalidate_sched_config()
 
     def add_config(
         self, name: str, clone_from: Optional[DeckConfig] = None
@@ -339,11 +341,18 @@ class DeckManager:
                 g["conf"] = 1
                 self.save(g)
         self.col._backend.remove_deck_config(id)
+        self._invalidate_sched_config()
 
     def setConf(self, grp: DeckConfig, id: int) -> None:
         grp["conf"] = id
         self.save(grp)
 
+    def _invalidate_sched_config(self) -> None:
+        "Drop config the scheduler has cached, if it caches any."
+        sched = getattr(self.col, "sched", None)
+        if hasattr(sched, "invalidate_config_cache"):
+            sched.invalidate_config_cache()
+
     def didsForConf(self, conf: DeckConfig) -> List[int]:
         dids = []
         for deck in self.all():
@@ -8,11 +8,14 @@ used by Anki.
 
 from __future__ import annotations
 
+import functools
+import json
 import pprint
 import random
 import time
-from heapq import *
-from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+from bisect import insort
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence, Tuple, Union
 
 import anki  # pylint: disable=unused-import
 import anki._backend.backend_pb2 as _pb
@@ -22,13 +25,77 @@ from anki.consts import *
 from anki.decks import Deck, DeckConfig, DeckManager, DeckTreeNode, QueueConfig
 from anki.notes import Note
 from anki.types import assert_exhaustive
-from anki.utils import from_json_bytes, ids2str, intTime
+from anki.utils import ids2str, intTime
 
 CongratsInfo = _pb.CongratsInfoOut
 CountsForDeckToday = _pb.CountsForDeckTodayOut
 SchedTimingToday = _pb.SchedTimingTodayOut
 UnburyCurrentDeck = _pb.UnburyCardsInCurrentDeckIn
 BuryOrSuspend = _pb.BuryOrSuspendCardsIn
+QueuedCards = _pb.GetQueuedCardIdsIn
+
+# (state attribute, rating) for each answer button, indexed by ease-1
+_EASE_MAP = (
+    ("again", _pb.AnswerCardIn.AGAIN),
+    ("hard", _pb.AnswerCardIn.HARD),
+    ("good", _pb.AnswerCardIn.GOOD),
+    ("easy", _pb.AnswerCardIn.EASY),
+)
+
+# card types whose learning steps come from the lapse config
+_LAPSE_TYPE_MASK = (1 << CARD_TYPE_REV) | (1 << CARD_TYPE_RELEARNING)
+
+# max decks whose config the scheduler keeps cached
+_CONF_CACHE_SIZE = 256
+
+# update_stats() argument for each legacy _updateStats() type
+_STATS_KW = {"new": "new_delta", "rev": "review_delta", "time": "milliseconds_delta"}
+
+# Queue-related SQL is built once at import time. Deck lists are bound as a
+# JSON array and expanded with json_each(), so the statement text stays the
+# same as the active decks change, and the prepared statement can be reused.
+
+_NEW_FOR_DECK_SQL = f"""
+select count() from
+(select 1 from cards where did = ? and queue = {QUEUE_TYPE_NEW} limit ?)"""
+
+_TOTAL_NEW_SQL = f"""
+select count() from cards where id in (
+select id from cards where did in (select value from json_each(?)) and queue = {QUEUE_TYPE_NEW} limit ?)"""
+
+_LRN_COUNT_SQL = f"""
+select count() from cards where did in (select value from json_each(?))
+and queue in ({QUEUE_TYPE_LRN},{QUEUE_TYPE_DAY_LEARN_RELEARN},{QUEUE_TYPE_PREVIEW})
+and (queue = {QUEUE_TYPE_PREVIEW}
+  or (queue = {QUEUE_TYPE_LRN} and due < ?)
+  or (queue = {QUEUE_TYPE_DAY_LEARN_RELEARN} and due <= ?))"""
+
+_FILL_LRN_SQL = f"""
+select due, id from cards where
+did in (select value from json_each(?))
+and queue in ({QUEUE_TYPE_LRN},{QUEUE_TYPE_PREVIEW}) and due < ?
+order by due, id limit ?"""
+
+_REV_FOR_DECK_SQL = f"""
+select count() from
+(select 1 from cards where did in (select value from json_each(?))
+and queue = {QUEUE_TYPE_REV} and due <= ? limit ?)"""
+
+_TOTAL_REV_SQL = f"""
+select count() from cards where id in (
+select id from cards where did in (select value from json_each(?))
+and queue = {QUEUE_TYPE_REV} and due <= ? limit ?)"""
+
+_NON_NEW_CARDS_SQL = f"""
+select id from cards where id in %s
+and (queue != {QUEUE_TYPE_NEW} or type != {CARD_TYPE_NEW})"""
+
+_RESET_CARDS_SQL = f"""
+update cards set reps=0,lapses=0,odid=0,odue=0,queue={QUEUE_TYPE_NEW}
+where id in %s"""
+
+# filtered cards matching a legacy emptyDyn() filter; %s is the filter
+_EMPTY_DYN_IDS_SQL = "select id from cards where (%s) and odid"
 
 
 class Scheduler:
@@ -43,7 +110,24 @@ class Scheduler:
         self.today: Optional[int] = None
         self._haveQueues = False
         self._lrnCutoff = 0
+        self._active_dids_json: Optional[str] = None
+        self._deck_limit: Optional[str] = None
+        self._counts_today_cache: Dict[int, CountsForDeckToday] = {}
+        self._deck_and_parents_cache: Dict[int, List[Deck]] = {}
+        # deck config by deck id, kept until the next reset or invalidation;
+        # bounded, so collections with a very large number of decks don't
+        # accumulate every deck's config over a long session
+        self._deck_conf_cache = functools.lru_cache(maxsize=_CONF_CACHE_SIZE)(
+            self._uncached_deck_conf
+        )
+        # queries run for every deck or card
+        db = self.col.db
+        self._new_for_deck_query = db.fixed_query(_NEW_FOR_DECK_SQL)
+        self._rev_for_deck_query = db.fixed_query(_REV_FOR_DECK_SQL)
+        self._lrn_count_query = db.fixed_query(_LRN_COUNT_SQL)
+        self._fill_lrn_query = db.fixed_query(_FILL_LRN_SQL)
         self._updateCutoff()
+        self._reset_config()
 
     # Daily cutoff
     ##########################################################################
@@ -66,13 +150,28 @@ class Scheduler:
 
     def reset(self) -> None:
         self.col.decks.update_active()
+        # active decks may have changed
+        self._active_dids_json = None
+        self._deck_limit = None
+        self._counts_today_cache.clear()
+        self._deck_and_parents_cache.clear()
+        self.invalidate_config_cache()
         self._updateCutoff()
+        self._reset_config()
         self._reset_counts()
         self._resetLrn()
         self._resetRev()
         self._resetNew()
         self._haveQueues = True
 
+    def _reset_config(self) -> None:
+        # these are consulted for every card, so we read them once per reset
+        # instead of going through the config on each lookup
+        self._collapse_time: int = self.col.conf["collapseTime"]
+        self._new_spread: int = self.col.conf["newSpread"]
+        self._new_cards_first = self._new_spread == NEW_CARDS_FIRST
+        self._day_learn_first: bool = self.col.conf.get("dayLearnFirst", False)
+
     def _reset_counts(self) -> None:
         tree = self.deck_due_tree(self.col.decks.selected())
         node = self.col.decks.find_deck_in_tree(tree, int(self.col.conf["curDeck"]))
@@ -103,6 +202,11 @@ class Scheduler:
 
     def _getCard(self) -> Optional[Card]:
         """Return the next due card, or None."""
+        # nothing left in any queue? only a collapsed learning card (or one
+        # that has become due since the last count) can still be shown
+        if not (self.newCount or self.revCount or self.lrnCount):
+            return self._getLrnCard(collapse=True)
+
         # learning card due?
         c = self._getLrnCard()
         if c:
@@ -115,7 +219,7 @@ class Scheduler:
                 return c
 
         # day learning first and card due?
-        dayLearnFirst = self.col.conf.get("dayLearnFirst", False)
+        dayLearnFirst = self._day_learn_first
         if dayLearnFirst:
             c = self._getLrnDayCard()
             if c:
@@ -144,7 +248,7 @@ class Scheduler:
     ##########################################################################
 
     def _resetNew(self) -> None:
-        self._newDids = self.col.decks.active()[:]
+        self._newDids: Deque[int] = deque(self.col.decks.active())
         self._newQueue: List[int] = []
         self._updateNewCardRatio()
 
@@ -158,17 +262,12 @@ class Scheduler:
             lim = min(self.queueLimit, self._deckNewLimit(did))
             if lim:
                 # fill the queue with the current did
-                self._newQueue = self.col.db.list(
-                    f"""
-                select id from cards where did = ? and queue = {QUEUE_TYPE_NEW} order by due,ord limit ?""",
-                    did,
-                    lim,
-                )
+                self._newQueue = self._queued_card_ids(QueuedCards.NEW, [did], lim)
                 if self._newQueue:
                     self._newQueue.reverse()
                     return True
             # nothing left in the deck; move to next
-            self._newDids.pop(0)
+            self._newDids.popleft()
 
         # if we didn't get a card but the count is non-zero,
         # we need to check again for any cards that were
@@ -187,7 +286,7 @@ class Scheduler:
         return None
 
     def _updateNewCardRatio(self) -> None:
-        if self.col.conf["newSpread"] == NEW_CARDS_DISTRIBUTE:
+        if self._new_spread == NEW_CARDS_DISTRIBUTE:
             if self.newCount:
                 self.newCardModulus = (self.newCount + self.revCount) // self.newCount
                 # if there are cards to review, ensure modulo >= 2
@@ -200,25 +299,19 @@ class Scheduler:
         "True if it's time to display a new card when distributing."
         if not self.newCount:
             return False
-        if self.col.conf["newSpread"] == NEW_CARDS_LAST:
-            return False
-        elif self.col.conf["newSpread"] == NEW_CARDS_FIRST:
-            return True
-        elif self.newCardModulus:
+        # the modulus is only set when distributing
+        if self.newCardModulus:
             return self.reps != 0 and self.reps % self.newCardModulus == 0
-        else:
-            # shouldn't reach
-            return None
+        return self._new_cards_first
 
     def _deckNewLimit(
         self, did: int, fn: Optional[Callable[[Deck], int]] = None
     ) -> int:
         if not fn:
             fn = self._deckNewLimitSingle
-        sel = self.col.decks.get(did)
         lim = -1
         # for the deck and each of its parents
-        for g in [sel] + self.col.decks.parents(did):
+        for g in self._deck_and_parents(did):
             rem = fn(g)
             if lim == -1:
                 lim = rem
@@ -231,37 +324,26 @@ class Scheduler:
         if not lim:
             return 0
         lim = min(lim, self.reportLimit)
-        return self.col.db.scalar(
-            f"""
-select count() from
-(select 1 from cards where did = ? and queue = {QUEUE_TYPE_NEW} limit ?)""",
-            did,
-            lim,
-        )
+        return self._new_for_deck_query.scalar(did, lim)
 
     def _deckNewLimitSingle(self, g: DeckConfig) -> int:
         "Limit for deck without parent limits."
         if g["dyn"]:
             return self.dynReportLimit
-        c = self.col.decks.confForDid(g["id"])
-        limit = max(0, c["new"]["perDay"] - self.counts_for_deck_today(g["id"]).new)
+        c = self._deck_conf_cache(g["id"])
+        studied = self._cached_counts_for_deck_today(g["id"]).new
+        limit = max(0, c["new"]["perDay"] - studied)
         return hooks.scheduler_new_limit_for_single_deck(limit, g)
 
     def totalNewForCurrentDeck(self) -> int:
-        return self.col.db.scalar(
-            f"""
-select count() from cards where id in (
-select id from cards where did in %s and queue = {QUEUE_TYPE_NEW} limit ?)"""
-            % self._deckLimit(),
-            self.reportLimit,
-        )
+        return self.col.db.scalar(_TOTAL_NEW_SQL, self._active_dids(), self.reportLimit)
 
     # Fetching learning cards
     ##########################################################################
 
     # scan for any newly due learning cards every minute
     def _updateLrnCutoff(self, force: bool) -> bool:
-        nextCutoff = intTime() + self.col.conf["collapseTime"]
+        nextCutoff = intTime() + self._collapse_time
         if nextCutoff - self._lrnCutoff > 60 or force:
             self._lrnCutoff = nextCutoff
             return True
@@ -272,31 +354,9 @@ select id from cards where did in %s and queue = {QUEUE_TYPE_NEW} limit ?)"""
             self._resetLrn()
 
     def _resetLrnCount(self) -> None:
-        # sub-day
-        self.lrnCount = (
-            self.col.db.scalar(
-                f"""
-select count() from cards where did in %s and queue = {QUEUE_TYPE_LRN}
-and due < ?"""
-                % (self._deckLimit()),
-                self._lrnCutoff,
-            )
-            or 0
-        )
-        # day
-        self.lrnCount += self.col.db.scalar(
-            f"""
-select count() from cards where did in %s and queue = {QUEUE_TYPE_DAY_LEARN_RELEARN}
-and due <= ?"""
-            % (self._deckLimit()),
-            self.today,
-        )
-        # previews
-        self.lrnCount += self.col.db.scalar(
-            f"""
-select count() from cards where did in %s and queue = {QUEUE_TYPE_PREVIEW}
-"""
-            % (self._deckLimit())
+        # sub-day, day and preview cards in a single pass over the index
+        self.lrnCount = self._lrn_count_query.scalar(
+            self._active_dids(), self._lrnCutoff, self.today
         )
 
     def _resetLrn(self) -> None:
@@ -304,7 +364,7 @@ select count() from cards where did in %s and queue = {QUEUE_TYPE_PREVIEW}
         self._resetLrnCount()
         self._lrnQueue: List[Tuple[int, int]] = []
         self._lrnDayQueue: List[int] = []
-        self._lrnDids = self.col.decks.active()[:]
+        self._lrnDids: Deque[int] = deque(self.col.decks.active())
 
     # sub-day learning
     def _fillLrn(self) -> Union[bool, List[Any]]:
@@ -312,19 +372,11 @@ select count() from cards where did in %s and queue = {QUEUE_TYPE_PREVIEW}
             return False
         if self._lrnQueue:
             return True
-        cutoff = intTime() + self.col.conf["collapseTime"]
-        self._lrnQueue = self.col.db.all(  # type: ignore
-            f"""
-select due, id from cards where
-did in %s and queue in ({QUEUE_TYPE_LRN},{QUEUE_TYPE_PREVIEW}) and due < ?
-limit %d"""
-            % (self._deckLimit(), self.reportLimit),
-            cutoff,
-        )
-        for i in range(len(self._lrnQueue)):
-            self._lrnQueue[i] = (self._lrnQueue[i][0], self._lrnQueue[i][1])
-        # as it arrives sorted by did first, we need to sort it
-        self._lrnQueue.sort()
+        cutoff = intTime() + self._collapse_time
+        # the queue holds (-due, -id) in ascending order, so the next card
+        # is popped off the end and requeued cards can be insorted
+        rows = self._fill_lrn_query.all(self._active_dids(), cutoff, self.reportLimit)
+        self._lrnQueue = [(-due, -id) for due, id in reversed(rows)]
         return self._lrnQueue
 
     def _getLrnCard(self, collapse: bool = False) -> Optional[Card]:
@@ -332,9 +384,9 @@ limit %d"""
         if self._fillLrn():
             cutoff = time.time()
             if collapse:
-                cutoff += self.col.conf["collapseTime"]
-            if self._lrnQueue[0][0] < cutoff:
-                id = heappop(self._lrnQueue)[1]
+                cutoff += self._collapse_time
+            if -self._lrnQueue[-1][0] < cutoff:
+                id = -self._lrnQueue.pop()[1]
                 card = self.col.getCard(id)
                 self.lrnCount -= 1
                 return card
@@ -349,25 +401,19 @@ limit %d"""
         while self._lrnDids:
             did = self._lrnDids[0]
             # fill the queue with the current did
-            self._lrnDayQueue = self.col.db.list(
-                f"""
-select id from cards where
-did = ? and queue = {QUEUE_TYPE_DAY_LEARN_RELEARN} and due <= ? limit ?""",
-                did,
-                self.today,
-                self.queueLimit,
+            self._lrnDayQueue = self._queued_card_ids(
+                QueuedCards.DAY_LEARN, [did], self.queueLimit
             )
             if self._lrnDayQueue:
-                # order
-                r = random.Random()
-                r.seed(self.today)
-                r.shuffle(self._lrnDayQueue)
+                # order; seeding in the constructor avoids first seeding
+                # the generator from the OS and then reseeding it
+                random.Random(self.today).shuffle(self._lrnDayQueue)
                 # is the current did empty?
                 if len(self._lrnDayQueue) < self.queueLimit:
-                    self._lrnDids.pop(0)
+                    self._lrnDids.popleft()
                 return True
             # nothing left in the deck; move to next
-            self._lrnDids.pop(0)
+            self._lrnDids.popleft()
         # shouldn't reach here
         return False
 
@@ -394,13 +440,17 @@ did = ? and queue = {QUEUE_TYPE_DAY_LEARN_RELEARN} and due <= ? limit ?""",
         if d["dyn"]:
             return self.dynReportLimit
 
-        c = self.col.decks.confForDid(d["id"])
-        lim = max(0, c["rev"]["perDay"] - self.counts_for_deck_today(d["id"]).review)
+        c = self._deck_conf_cache(d["id"])
+        studied = self._cached_counts_for_deck_today(d["id"]).review
+        lim = max(0, c["rev"]["perDay"] - studied)
 
         if parentLimit is not None:
             lim = min(parentLimit, lim)
         elif "::" in d["name"]:
-            for parent in self.col.decks.parents(d["id"]):
+            for parent in self._deck_and_parents(d["id"])[1:]:
+                if not lim:
+                    # parents can only lower the limit further
+                    break
                 # pass in dummy parentLimit so we don't do parent lookup again
                 lim = min(lim, self._deckRevLimitSingle(parent, parentLimit=lim))
         return hooks.scheduler_review_limit_for_single_deck(lim, d)
@@ -410,15 +460,7 @@ did = ? and queue = {QUEUE_TYPE_DAY_LEARN_RELEARN} and due <= ? limit ?""",
     ) -> Any:
         dids = [did] + self.col.decks.childDids(did, childMap)
         lim = min(lim, self.reportLimit)
-        return self.col.db.scalar(
-            f"""
-select count() from
-(select 1 from cards where did in %s and queue = {QUEUE_TYPE_REV}
-and due <= ? limit ?)"""
-            % ids2str(dids),
-            self.today,
-            lim,
-        )
+        return self._rev_for_deck_query.scalar(json.dumps(dids), self.today, lim)
 
     def _resetRev(self) -> None:
         self._revQueue: List[int] = []
@@ -432,15 +474,8 @@ and due <= ? limit ?)"""
 
         lim = min(self.queueLimit, self._currentRevLimit())
         if lim:
-            self._revQueue = self.col.db.list(
-                f"""
-select id from cards where
-did in %s and queue = {QUEUE_TYPE_REV} and due <= ?
-order by due, random()
-limit ?"""
-                % self._deckLimit(),
-                self.today,
-                lim,
+            self._revQueue = self._queued_card_ids(
+                QueuedCards.REVIEW, self.col.decks.active(), lim
             )
 
             if self._revQueue:
@@ -473,49 +508,48 @@ limit ?"""
         if self._burySiblingsOnAnswer:
             self._burySiblings(card)
 
-        new_state = self._answerCard(card, ease)
+        # a single timestamp for the whole answer
+        now_millis = intTime(1000)
+        now = now_millis // 1000
 
-        if not self._handle_leech(card, new_state):
-            self._maybe_requeue_card(card)
+        new_state = self._answerCard(card, ease, now_millis)
+        # studied counts have changed
+        self._counts_today_cache.clear()
 
-    def _answerCard(self, card: Card, ease: int) -> _pb.SchedulingState:
+        if not self._handle_leech(card, new_state, now):
+            self._maybe_requeue_card(card, now)
+
+    def _answerCard(
+        self, card: Card, ease: int, now_millis: int
+    ) -> _pb.SchedulingState:
         states = self.col._backend.get_next_card_states(card.id)
-        if ease == BUTTON_ONE:
-            new_state = states.again
-            rating = _pb.AnswerCardIn.AGAIN
-        elif ease == BUTTON_TWO:
-            new_state = states.hard
-            rating = _pb.AnswerCardIn.HARD
-        elif ease == BUTTON_THREE:
-            new_state = states.good
-            rating = _pb.AnswerCardIn.GOOD
-        elif ease == BUTTON_FOUR:
-            new_state = states.easy
-            rating = _pb.AnswerCardIn.EASY
-        else:
-            assert False, "invalid ease"
+        attr, rating = _EASE_MAP[ease - 1]
+        new_state = getattr(states, attr)
 
-        self.col._backend.answer_card(
+        backend_card = self.col._backend.answer_card(
             card_id=card.id,
             current_state=states.current,
             new_state=new_state,
             rating=rating,
-            answered_at_millis=intTime(1000),
+            answered_at_millis=now_millis,
             milliseconds_taken=card.timeTaken(),
         )
 
-        # fixme: tests assume card will be mutated, so we need to reload it
-        card.load()
+        # callers expect the card to be mutated; the backend returns the
+        # updated card, so there's no need to fetch it again
+        card._load_from_backend_card(backend_card)
 
         return new_state
 
-    def _handle_leech(self, card: Card, new_state: _pb.SchedulingState) -> bool:
+    def _handle_leech(
+        self, card: Card, new_state: _pb.SchedulingState, now: int
+    ) -> bool:
         "True if was leech."
         if self.col._backend.state_is_leech(new_state):
             if hooks.card_did_leech.count() > 0:
                 hooks.card_did_leech(card)
                 # leech hooks assumed that card mutations would be saved for them
-                card.mod = intTime()
+                card.mod = now
                 card.usn = self.col.usn()
                 card.flush()
 
@@ -523,7 +557,7 @@ limit ?"""
         else:
             return False
 
-    def _maybe_requeue_card(self, card: Card) -> None:
+    def _maybe_requeue_card(self, card: Card, now: int) -> None:
         # preview cards
         if card.queue == QUEUE_TYPE_PREVIEW:
             # adjust the count immediately, and rely on the once a minute
@@ -534,7 +568,7 @@ limit ?"""
         # learning cards
         if not card.queue == QUEUE_TYPE_LRN:
             return
-        if card.due >= (intTime() + self.col.conf["collapseTime"]):
+        if card.due >= (now + self._collapse_time):
             return
 
         # card is due within collapse time, so we'll want to add it
@@ -545,23 +579,66 @@ limit ?"""
         # sure we don't put it at the head of the queue and end up showing
         # it twice in a row
         if self._lrnQueue and not self.revCount and not self.newCount:
-            smallestDue = self._lrnQueue[0][0]
+            smallestDue = -self._lrnQueue[-1][0]
             card.due = max(card.due, smallestDue + 1)
 
-        heappush(self._lrnQueue, (card.due, card.id))
+        insort(self._lrnQueue, (-card.due, -card.id))
+
+    def _queued_card_ids(
+        self, queue: QueuedCards.Queue.V, deck_ids: List[int], limit: int
+    ) -> List[int]:
+        "Card ids for one of the queues, returned by the backend as a packed list."
+        return list(
+            self.col._backend.get_queued_card_ids(
+                queue=queue, deck_ids=deck_ids, days_elapsed=self.today, limit=limit
+            )
+        )
+
+    def _deck_and_parents(self, did: int) -> List[Deck]:
+        "The deck followed by its parents. Cached until the next reset."
+        decks = self._deck_and_parents_cache.get(did)
+        if decks is None:
+            decks = [self.col.decks.get(did)] + self.col.decks.parents(did)
+            self._deck_and_parents_cache[did] = decks
+        return decks
+
+    def _uncached_deck_conf(self, did: int) -> DeckConfig:
+        return self.col.decks.confForDid(did)
+
+    def invalidate_config_cache(self) -> None:
+        "Call after changing deck config outside of a reset."
+        self._deck_conf_cache.cache_clear()
 
     def _cardConf(self, card: Card) -> DeckConfig:
         return self.col.decks.confForDid(card.did)
 
     def _home_config(self, card: Card) -> DeckConfig:
-        return self.col.decks.confForDid(card.odid or card.did)
+        return self._deck_conf_cache(card.odid or card.did)
 
     def _deckLimit(self) -> str:
-        return ids2str(self.col.decks.active())
+        "SQL list of active decks; cached until the next reset."
+        if self._deck_limit is None:
+            self._deck_limit = ids2str(self.col.decks.active())
+        return self._deck_limit
+
+    def _active_dids(self) -> str:
+        "JSON list of active decks for json_each(); cached until the next reset."
+        if self._active_dids_json is None:
+            self._active_dids_json = json.dumps(self.col.decks.active())
+        return self._active_dids_json
 
     def counts_for_deck_today(self, deck_id: int) -> CountsForDeckToday:
         return self.col._backend.counts_for_deck_today(deck_id)
 
+    def _cached_counts_for_deck_today(self, deck_id: int) -> CountsForDeckToday:
+        """As above, but remembered until the next reset or answer, as the
+        limit calculations ask for the same decks repeatedly."""
+        counts = self._counts_today_cache.get(deck_id)
+        if counts is None:
+            counts = self.counts_for_deck_today(deck_id)
+            self._counts_today_cache[deck_id] = counts
+        return counts
+
     # Next times
     ##########################################################################
     # fixme: move these into tests_schedv2 in the future
@@ -604,54 +681,35 @@ limit ?"""
 
     def nextIvl(self, card: Card, ease: int) -> Any:
         "Don't use this - it is only required by tests, and will be moved in the future."
+        assert BUTTON_ONE <= ease <= BUTTON_FOUR, "invalid ease"
         states = self.col._backend.get_next_card_states(card.id)
-        if ease == BUTTON_ONE:
-            new_state = states.again
-        elif ease == BUTTON_TWO:
-            new_state = states.hard
-        elif ease == BUTTON_THREE:
-            new_state = states.good
-        elif ease == BUTTON_FOUR:
-            new_state = states.easy
-        else:
-            assert False, "invalid ease"
-
-        return self._interval_for_state(new_state)
+        attr, _rating = _EASE_MAP[ease - 1]
+        return self._interval_for_state(getattr(states, attr))
 
     # Sibling spacing
     ##########################################################################
 
     def _burySiblings(self, card: Card) -> None:
-        toBury: List[int] = []
         conf = self._home_config(card)
         bury_new = conf["new"].get("bury", True)
-        bury_rev = conf["rev"].get("bury", True)
-        # loop through and remove from queues
-        for cid, queue in self.col.db.execute(
-            f"""
-select id, queue from cards where nid=? and id!=?
-and (queue={QUEUE_TYPE_NEW} or (queue={QUEUE_TYPE_REV} and due<=?))""",
-            card.nid,
-            card.id,
-            self.today,
-        ):
-            if queue == QUEUE_TYPE_REV:
-                queue_obj = self._revQueue
-                if bury_rev:
-                    toBury.append(cid)
-            else:
-                queue_obj = self._newQueue
-                if bury_new:
-                    toBury.append(cid)
-
-            # even if burying disabled, we still discard to give same-day spacing
-            try:
-                queue_obj.remove(cid)
-            except ValueError:
-                pass
-        # then bury
-        if toBury:
-            self.bury_cards(toBury, manual=False)
+        bury_reviews = conf["rev"].get("bury", True)
+        if not (bury_new or bury_reviews or self._newQueue or self._revQueue):
+            # nothing to bury, and no queued siblings to space out
+            return
+        siblings = self.col._backend.bury_siblings(
+            card_id=card.id,
+            note_id=card.nid,
+            bury_new=bury_new,
+            bury_reviews=bury_reviews,
+        )
+        # even if burying disabled, we still discard to give same-day spacing;
+        # filter each queue in a single pass instead of removing ids one by one
+        if siblings.review_card_ids and self._revQueue:
+            discard_rev = frozenset(siblings.review_card_ids)
+            self._revQueue = [cid for cid in self._revQueue if cid not in discard_rev]
+        if siblings.new_card_ids and self._newQueue:
+            discard_new = frozenset(siblings.new_card_ids)
+            self._newQueue = [cid for cid in self._newQueue if cid not in discard_new]
 
     # Review-related UI helpers
     ##########################################################################
@@ -707,6 +765,7 @@ and (queue={QUEUE_TYPE_NEW} or (queue={QUEUE_TYPE_REV} and due<=?))""",
     def extendLimits(self, new: int, rev: int) -> None:
         did = self.col.decks.current()["id"]
         self.col._backend.extend_limits(deck_id=did, new_delta=new, review_delta=rev)
+        self._counts_today_cache.clear()
 
     def _is_finished(self) -> bool:
         "Don't use this, it is a stop-gap until this code is refactored."
@@ -714,12 +773,7 @@ and (queue={QUEUE_TYPE_NEW} or (queue={QUEUE_TYPE_REV} and due<=?))""",
 
     def totalRevForCurrentDeck(self) -> int:
         return self.col.db.scalar(
-            f"""
-select count() from cards where id in (
-select id from cards where did in %s and queue = {QUEUE_TYPE_REV} and due <= ? limit ?)"""
-            % self._deckLimit(),
-            self.today,
-            self.reportLimit,
+            _TOTAL_REV_SQL, self._active_dids(), self.today, self.reportLimit
         )
 
     # Filtered deck handling
@@ -777,15 +831,9 @@ select id from cards where did in %s and queue = {QUEUE_TYPE_REV} and due <= ? l
         "Completely reset cards for export."
         sids = ids2str(ids)
         # we want to avoid resetting due number of existing new cards on export
-        nonNew = self.col.db.list(
-            f"select id from cards where id in %s and (queue != {QUEUE_TYPE_NEW} or type != {CARD_TYPE_NEW})"
-            % sids
-        )
+        nonNew = self.col.db.list(_NON_NEW_CARDS_SQL % sids)
         # reset all cards
-        self.col.db.execute(
-            f"update cards set reps=0,lapses=0,odid=0,odue=0,queue={QUEUE_TYPE_NEW}"
-            " where id in %s" % sids
-        )
+        self.col.db.execute(_RESET_CARDS_SQL % sids)
         # and forget any non-new cards, changing their due numbers
         self.col._backend.schedule_cards_as_new(card_ids=nonNew, log=False)
 
@@ -875,43 +923,32 @@ select id from cards where did in %s and queue = {QUEUE_TYPE_REV} and due <= ? l
         print("finishedMsg() is obsolete")
         return ""
 
-    def _nextDueMsg(self) -> str:
-        print("_nextDueMsg() is obsolete")
-        return ""
-
     def rebuildDyn(self, did: Optional[int] = None) -> Optional[int]:
         did = did or self.col.decks.selected()
-        count = self.rebuild_filtered_deck(did) or None
-        if not count:
-            return None
-        # and change to our new deck
-        self.col.decks.select(did)
-        return count
+        # if any cards were gathered, the backend also changes to the deck
+        count = self.col._backend.rebuild_and_select_filtered_deck(did)
+        self.invalidate_config_cache()
+        # legacy callers expect None rather than 0 when nothing was gathered
+        return count or None
 
     def emptyDyn(self, did: Optional[int], lim: Optional[str] = None) -> None:
         if lim is None:
-            self.empty_filtered_deck(did)
-            return
-
-        queue = f"""
-queue = (case when queue < 0 then queue
-              when type in (1,{CARD_TYPE_RELEARNING}) then
-  (case when (case when odue then odue else due end) > 1000000000 then 1 else
-  {QUEUE_TYPE_DAY_LEARN_RELEARN} end)
-else
-  type
-end)
-"""
-        self.col.db.execute(
-            """
-update cards set did = odid, %s,
-due = (case when odue>0 then odue else due end), odue = 0, odid = 0, usn = ? where %s"""
-            % (queue, lim),
-            self.col.usn(),
-        )
+            self._empty_dyn_by_deck(did)
+        else:
+            self._empty_dyn_by_ids(self.col.db.list(_EMPTY_DYN_IDS_SQL % lim))
 
     def remFromDyn(self, cids: List[int]) -> None:
-        self.emptyDyn(None, f"id in {ids2str(cids)} and odid")
+        self._empty_dyn_by_ids(cids)
+
+    def _empty_dyn_by_deck(self, did: int) -> None:
+        self.empty_filtered_deck(did)
+        self.invalidate_config_cache()
+
+    def _empty_dyn_by_ids(self, cids: List[int]) -> None:
+        "Return cards to their home decks; the backend restores queue and due."
+        if cids:
+            self.col._backend.remove_cards_from_filtered_decks(cids)
+            self.invalidate_config_cache()
 
     def update_stats(
         self,
@@ -926,22 +963,12 @@ due = (case when odue>0 then odue else due end), odue = 0, odid = 0, usn = ? whe
             review_delta=review_delta,
             millisecond_delta=milliseconds_delta,
         )
+        self._counts_today_cache.clear()
 
     def _updateStats(self, card: Card, type: str, cnt: int = 1) -> None:
-        did = card.did
-        if type == "new":
-            self.update_stats(did, new_delta=cnt)
-        elif type == "rev":
-            self.update_stats(did, review_delta=cnt)
-        elif type == "time":
-            self.update_stats(did, milliseconds_delta=cnt)
-
-    def deckDueTree(self) -> List:
-        "List of (base name, did, rev, lrn, new, children)"
-        print(
-            "deckDueTree() is deprecated; use decks.deck_tree() for a tree without counts, or sched.deck_due_tree()"
-        )
-        return from_json_bytes(self.col._backend.deck_tree_legacy())[5]
+        kw = _STATS_KW.get(type)
+        if kw:
+            self.update_stats(card.did, **{kw: cnt})
 
     def _newConf(self, card: Card) -> QueueConfig:
         return self._home_config(card)["new"]
@@ -953,10 +980,10 @@ due = (case when odue>0 then odue else due end), odue = 0, odid = 0, usn = ? whe
         return self._home_config(card)["rev"]
 
     def _lrnConf(self, card: Card) -> QueueConfig:
-        if card.type in (CARD_TYPE_REV, CARD_TYPE_RELEARNING):
-            return self._lapseConf(card)
+        if (1 << card.type) & _LAPSE_TYPE_MASK:
+            return self._home_config(card)["lapse"]
         else:
-            return self._newConf(card)
+            return self._home_config(card)["new"]
 
     unsuspendCards = unsuspend_cards
     buryCards = bury_cards
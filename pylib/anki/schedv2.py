@@ -327,10 +327,10 @@ limit %d"""
             % (self._deckLimit(), self.reportLimit),
             cutoff,
         )
-        for i in range(len(self._lrnQueue)):
-            self._lrnQueue[i] = (self._lrnQueue[i][0], self._lrnQueue[i][1])
-        # as it arrives sorted by did first, we need to sort it
-        self._lrnQueue.sort()
+        # rows arrive as lists, which can't be compared with the tuples
+        # heappush() adds later, so convert them while sorting (as it
+        # arrives sorted by did first)
+        self._lrnQueue = sorted((due, id) for due, id in self._lrnQueue)
         return self._lrnQueue
 
     def _getLrnCard(self, collapse: bool = False) -> Optional[Card]:
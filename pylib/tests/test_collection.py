@@ -169,3 +169,20 @@ def test_db_named_args(capsys):
 
     # swallow the warning
     _ = capsys.readouterr()
+
+
+def test_db_fixed_query():
+    col = getEmptyCol()
+    query = col.db.fixed_query("select id, ? from notetypes where id > ? order by id")
+    rows = query.all("x", 0)
+    assert rows == col.db.all(
+        "select id, ? from notetypes where id > ? order by id", "x", 0
+    )
+    assert rows and all(row[1] == "x" for row in rows)
+    assert query.scalar("y", 0) == rows[0][0]
+    assert query.scalar("y", rows[-1][0]) is None
+    # only for reads, as writes would not mark the collection modified
+    assertException(AssertionError, lambda: col.db.fixed_query("delete from cards"))
+    assertException(
+        AssertionError, lambda: col.db.fixed_query(" UPDATE cards set mod=?")
+    )
@@ -631,6 +631,42 @@ def test_bury():
     assert col.sched.counts() == (2, 0, 0)
 
 
+def test_bury_siblings_follows_config():
+    col = getEmptyCol()
+    m = col.models.current()
+    mm = col.models
+    t = mm.newTemplate("Reverse")
+    t["qfmt"] = "{{Back}}"
+    t["afmt"] = "{{Front}}"
+    mm.addTemplate(m, t)
+    mm.save(m)
+    notes = []
+    for i in range(2):
+        note = col.newNote()
+        note["Front"] = str(i)
+        note["Back"] = str(i)
+        col.addNote(note)
+        notes.append(note)
+    conf = col.decks.confForDid(1)
+    conf["new"]["bury"] = False
+    col.decks.update_config(conf)
+    col.reset()
+    # answering without burying leaves the sibling alone
+    c, sibling = notes[0].cards()
+    c.startTimer()
+    col.sched.answerCard(c, 3)
+    sibling.load()
+    assert sibling.queue == QUEUE_TYPE_NEW
+    # changing the option applies to the next answer without a reset
+    conf["new"]["bury"] = True
+    col.decks.update_config(conf)
+    c, sibling = notes[1].cards()
+    c.startTimer()
+    col.sched.answerCard(c, 3)
+    sibling.load()
+    assert sibling.queue == QUEUE_TYPE_SIBLING_BURIED
+
+
 def test_suspend():
     col = getEmptyCol()
     note = col.newNote()
@@ -623,14 +623,54 @@ impl BackendService for Backend {
         })
     }
 
+    fn bury_siblings(&self, input: pb::BurySiblingsIn) -> BackendResult<pb::BurySiblingsOut> {
+        self.with_col(|col| {
+            col.bury_siblings(
+                CardID(input.card_id),
+                NoteID(input.note_id),
+                input.bury_new,
+                input.bury_reviews,
+            )
+        })
+    }
+
+    fn get_queued_card_ids(&self, input: pb::GetQueuedCardIdsIn) -> BackendResult<pb::CardIDs> {
+        use pb::get_queued_card_ids_in::Queue;
+        let queue = match input.queue() {
+            Queue::New => CardQueue::New,
+            Queue::Review => CardQueue::Review,
+            Queue::DayLearn => CardQueue::DayLearn,
+        };
+        let dids: Vec<_> = input.deck_ids.into_iter().map(DeckID).collect();
+        self.with_col(|col| {
+            col.storage
+                .queued_card_ids(queue, &dids, input.days_elapsed, input.limit)
+                .map(|v| pb::CardIDs {
+                    cids: v.into_iter().map(Into::into).collect(),
+                })
+        })
+    }
+
     fn empty_filtered_deck(&self, input: pb::DeckId) -> BackendResult<Empty> {
         self.with_col(|col| col.empty_filtered_deck(input.did.into()).map(Into::into))
     }
 
+    fn remove_cards_from_filtered_decks(&self, input: pb::CardIDs) -> BackendResult<Empty> {
+        let cids: Vec<_> = input.into();
+        self.with_col(|col| col.remove_cards_from_filtered_decks(&cids).map(Into::into))
+    }
+
     fn rebuild_filtered_deck(&self, input: pb::DeckId) -> BackendResult<pb::UInt32> {
         self.with_col(|col| col.rebuild_filtered_deck(input.did.into()).map(Into::into))
     }
 
+    fn rebuild_and_select_filtered_deck(&self, input: pb::DeckId) -> BackendResult<pb::UInt32> {
+        self.with_col(|col| {
+            col.rebuild_and_select_filtered_deck(input.did.into())
+                .map(Into::into)
+        })
+    }
+
     fn schedule_cards_as_new(&self, input: pb::ScheduleCardsAsNewIn) -> BackendResult<Empty> {
         self.with_col(|col| {
             let cids: Vec<_> = input.card_ids.into_iter().map(CardID).collect();
@@ -688,7 +728,7 @@ impl BackendService for Backend {
         Ok(state.leeched().into())
     }
 
-    fn answer_card(&self, input: pb::AnswerCardIn) -> BackendResult<pb::Empty> {
+    fn answer_card(&self, input: pb::AnswerCardIn) -> BackendResult<pb::Card> {
         self.with_col(|col| col.answer_card(&input.into()))
             .map(Into::into)
     }
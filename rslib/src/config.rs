@@ -2,7 +2,11 @@
 // License: GNU AGPL, version 3 or later; http://www.gnu.org/licenses/agpl.html
 
 use crate::{
-    backend_proto as pb, collection::Collection, decks::DeckID, err::Result, notetype::NoteTypeID,
+    backend_proto as pb,
+    collection::Collection,
+    decks::{Deck, DeckID},
+    err::Result,
+    notetype::NoteTypeID,
     timestamp::TimestampSecs,
 };
 use pb::config::bool::Key as BoolKey;
@@ -39,6 +43,7 @@ pub(crate) fn schema11_config_as_string() -> String {
 }
 
 pub(crate) enum ConfigKey {
+    ActiveDecks,
     AnswerTimeLimitSecs,
     BrowserSortKind,
     BrowserSortReverse,
@@ -80,6 +85,7 @@ pub(crate) enum SchedulerVersion {
 impl From<ConfigKey> for &'static str {
     fn from(c: ConfigKey) -> Self {
         match c {
+            ConfigKey::ActiveDecks => "activeDecks",
             ConfigKey::AnswerTimeLimitSecs => "timeLim",
             ConfigKey::BrowserSortKind => "sortType",
             ConfigKey::BrowserSortReverse => "sortBackwards",
@@ -200,6 +206,21 @@ impl Collection {
             .unwrap_or(DeckID(1))
     }
 
+    /// Make the deck current, and its children active along with it.
+    /// Config is only written if the selection changed.
+    pub(crate) fn set_current_deck(&self, deck: &Deck) -> Result<()> {
+        let mut active = vec![deck.id];
+        active.extend(self.storage.child_decks(deck)?.into_iter().map(|d| d.id));
+        let current_active: Vec<DeckID> = self
+            .get_config_optional(ConfigKey::ActiveDecks)
+            .unwrap_or_default();
+        if self.get_current_deck_id() != deck.id || current_active != active {
+            self.set_config(ConfigKey::CurrentDeckID, &deck.id)?;
+            self.set_config(ConfigKey::ActiveDecks, &active)?;
+        }
+        Ok(())
+    }
+
     pub(crate) fn get_creation_utc_offset(&self) -> Option<i32> {
         self.get_config_optional(ConfigKey::CreationOffset)
     }
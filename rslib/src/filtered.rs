@@ -183,12 +183,21 @@ impl Collection {
         self.return_cards_to_home_deck(&cids)
     }
 
+    /// Return the provided cards to their home decks. Cards that are not
+    /// in a filtered deck are left untouched.
+    pub fn remove_cards_from_filtered_decks(&mut self, cids: &[CardID]) -> Result<()> {
+        self.transact(None, |col| col.return_cards_to_home_deck(cids))
+    }
+
     // Unlike the old Python code, this also marks the cards as modified.
     fn return_cards_to_home_deck(&mut self, cids: &[CardID]) -> Result<()> {
         let sched = self.scheduler_version();
         let usn = self.usn()?;
         for cid in cids {
             if let Some(mut card) = self.storage.get_card(*cid)? {
+                if card.original_deck_id.0 == 0 {
+                    continue;
+                }
                 let original = card.clone();
                 card.remove_from_filtered_deck_restoring_queue(sched);
                 self.update_card(&mut card, &original, usn)?;
@@ -199,6 +208,16 @@ impl Collection {
 
     // Unlike the old Python code, this also marks the cards as modified.
     pub fn rebuild_filtered_deck(&mut self, did: DeckID) -> Result<u32> {
+        self.rebuild_filtered_deck_inner(did, false)
+    }
+
+    /// As above, but if any cards were gathered, the deck is also made the
+    /// current deck, in the same transaction.
+    pub fn rebuild_and_select_filtered_deck(&mut self, did: DeckID) -> Result<u32> {
+        self.rebuild_filtered_deck_inner(did, true)
+    }
+
+    fn rebuild_filtered_deck_inner(&mut self, did: DeckID, select: bool) -> Result<u32> {
         let deck = self.get_deck(did)?.ok_or(AnkiError::NotFound)?;
         let config = if let DeckKind::Filtered(kind) = &deck.kind {
             kind
@@ -215,7 +234,11 @@ impl Collection {
 
         self.transact(None, |col| {
             col.return_all_cards_in_filtered_deck(did)?;
-            col.build_filtered_deck(ctx)
+            let count = col.build_filtered_deck(ctx)?;
+            if select && count > 0 {
+                col.set_current_deck(&deck)?;
+            }
+            Ok(count)
         })
     }
 
@@ -289,3 +312,107 @@ then (ivl / cast({today}-due+0.001 as real)) else 100000+due end)",
 
     format!("{} limit {}", order, term.limit)
 }
+
+#[cfg(test)]
+mod test {
+    use super::*;
+    use crate::{collection::open_test_collection, config::ConfigKey};
+
+    fn config_mtime(col: &Collection, key: ConfigKey) -> i64 {
+        col.storage
+            .db
+            .query_row(
+                "select mtime_secs from config where key=?",
+                &[<&str>::from(key)],
+                |row| row.get(0),
+            )
+            .unwrap()
+    }
+
+    #[test]
+    fn rebuild_and_select() -> Result<()> {
+        let mut col = open_test_collection();
+        let mut deck = Deck::new_filtered();
+        deck.name = "filtered".into();
+        col.add_or_update_deck(&mut deck)?;
+
+        // nothing gathered, so the selection is unchanged
+        assert_eq!(col.rebuild_and_select_filtered_deck(deck.id)?, 0);
+        assert_eq!(col.get_current_deck_id(), DeckID(1));
+
+        let nt = col.get_notetype_by_name("Basic")?.unwrap();
+        let mut note = nt.new_note();
+        col.add_note(&mut note, DeckID(1))?;
+
+        // a plain rebuild doesn't select the deck
+        assert_eq!(col.rebuild_filtered_deck(deck.id)?, 1);
+        assert_eq!(col.get_current_deck_id(), DeckID(1));
+
+        assert_eq!(col.rebuild_and_select_filtered_deck(deck.id)?, 1);
+        assert_eq!(col.get_current_deck_id(), deck.id);
+        let active: Vec<DeckID> = col.get_config_optional(ConfigKey::ActiveDecks).unwrap();
+        assert_eq!(active, vec![deck.id]);
+
+        // rebuilding the already selected deck leaves the config alone
+        col.storage
+            .db
+            .execute_batch("update config set mtime_secs=0")?;
+        assert_eq!(col.rebuild_and_select_filtered_deck(deck.id)?, 1);
+        assert_eq!(config_mtime(&col, ConfigKey::CurrentDeckID), 0);
+        assert_eq!(config_mtime(&col, ConfigKey::ActiveDecks), 0);
+
+        Ok(())
+    }
+
+    #[test]
+    fn remove_cards_from_filtered_decks() -> Result<()> {
+        let mut col = open_test_collection();
+        let nt = col.get_notetype_by_name("Basic")?.unwrap();
+        let mut note = nt.new_note();
+        col.add_note(&mut note, DeckID(1))?;
+        let cid = col.search_cards("", SortMode::NoOrder)?[0];
+        let home_card = col.storage.get_card(cid)?.unwrap();
+
+        // without rescheduling, gathered cards are moved to the review queue
+        let mut deck = Deck::new_filtered();
+        deck.name = "filtered".into();
+        deck.filtered_mut()?.reschedule = false;
+        col.add_or_update_deck(&mut deck)?;
+        assert_eq!(col.rebuild_filtered_deck(deck.id)?, 1);
+        let filtered_card = col.storage.get_card(cid)?.unwrap();
+        assert_eq!(filtered_card.deck_id, deck.id);
+        assert_eq!(filtered_card.queue, CardQueue::Review);
+
+        // a card outside the filtered deck, with a distinct mtime and usn
+        let mut note = nt.new_note();
+        col.add_note(&mut note, DeckID(1))?;
+        let mut normal_card = col.storage.get_card_by_ordinal(note.id, 0)?.unwrap();
+        normal_card.mtime = TimestampSecs(0);
+        normal_card.usn = Usn(5);
+        col.storage.update_card(&normal_card)?;
+
+        col.remove_cards_from_filtered_decks(&[cid, normal_card.id])?;
+        assert_eq!(col.storage.get_card(normal_card.id)?.unwrap(), normal_card);
+        let card = col.storage.get_card(cid)?.unwrap();
+        assert_eq!(card.deck_id, DeckID(1));
+        assert_eq!(card.original_deck_id, DeckID(0));
+        assert_eq!(card.original_due, 0);
+        assert_eq!(card.queue, home_card.queue);
+        assert_eq!(card.due, home_card.due);
+
+        Ok(())
+    }
+
+    #[test]
+    fn selecting_activates_children() -> Result<()> {
+        let mut col = open_test_collection();
+        // filtered decks can't have children, so use a normal deck
+        let child = col.get_or_create_normal_deck("parent::child")?;
+        let parent = col.get_or_create_normal_deck("parent")?;
+        col.set_current_deck(&parent)?;
+        assert_eq!(col.get_current_deck_id(), parent.id);
+        let active: Vec<DeckID> = col.get_config_optional(ConfigKey::ActiveDecks).unwrap();
+        assert_eq!(active, vec![parent.id, child.id]);
+        Ok(())
+    }
+}
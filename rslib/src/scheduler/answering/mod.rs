@@ -213,12 +213,13 @@ impl Collection {
         ])
     }
 
-    /// Answer card, writing its new state to the database.
-    pub fn answer_card(&mut self, answer: &CardAnswer) -> Result<()> {
+    /// Answer card, writing its new state to the database, and return the
+    /// updated card.
+    pub fn answer_card(&mut self, answer: &CardAnswer) -> Result<Card> {
         self.transact(None, |col| col.answer_card_inner(answer))
     }
 
-    fn answer_card_inner(&mut self, answer: &CardAnswer) -> Result<()> {
+    fn answer_card_inner(&mut self, answer: &CardAnswer) -> Result<Card> {
         let card = self
             .storage
             .get_card(answer.card_id)?
@@ -246,7 +247,7 @@ impl Collection {
             self.add_leech_tag(card.note_id)?;
         }
 
-        Ok(())
+        Ok(card)
     }
 
     fn add_partial_revlog(
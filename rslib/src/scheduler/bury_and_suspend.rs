@@ -7,6 +7,7 @@ use crate::{
     collection::Collection,
     config::SchedulerVersion,
     err::Result,
+    notes::NoteID,
     search::SortMode,
 };
 
@@ -142,6 +143,53 @@ impl Collection {
             col.bury_or_suspend_searched_cards(mode)
         })
     }
+
+    /// Bury the new and due review siblings of a card, if enabled.
+    /// The ids of all such siblings are returned whether they were buried
+    /// or not, so the caller can remove them from its queues.
+    pub fn bury_siblings(
+        &mut self,
+        cid: CardID,
+        nid: NoteID,
+        bury_new: bool,
+        bury_reviews: bool,
+    ) -> Result<pb::BurySiblingsOut> {
+        let today = self.timing_today()?.days_elapsed as i32;
+        let mut out = pb::BurySiblingsOut::default();
+        let mut to_bury = vec![];
+        for card in self.storage.all_cards_of_note(nid)? {
+            if card.id == cid {
+                continue;
+            }
+            let bury = match card.queue {
+                CardQueue::New => {
+                    out.new_card_ids.push(card.id.0);
+                    bury_new
+                }
+                CardQueue::Review if card.due <= today => {
+                    out.review_card_ids.push(card.id.0);
+                    bury_reviews
+                }
+                _ => continue,
+            };
+            if bury {
+                to_bury.push(card);
+            }
+        }
+        // avoid marking the collection modified when nothing changes
+        if !to_bury.is_empty() {
+            self.transact(None, |col| {
+                let usn = col.usn()?;
+                for original in to_bury {
+                    let mut card = original.clone();
+                    card.queue = CardQueue::SchedBuried;
+                    col.update_card(&mut card, &original, usn)?;
+                }
+                Ok(())
+            })?;
+        }
+        Ok(out)
+    }
 }
 
 #[cfg(test)]
@@ -149,7 +197,9 @@ mod test {
     use crate::{
         card::{Card, CardQueue},
         collection::{open_test_collection, Collection},
+        notes::NoteID,
         search::SortMode,
+        timestamp::TimestampMillis,
     };
 
     #[test]
@@ -179,4 +229,41 @@ mod test {
         col.unbury_if_day_rolled_over(timing).unwrap();
         assert_count(&mut col, 0);
     }
+
+    #[test]
+    fn bury_siblings() {
+        let mut col = open_test_collection();
+        let nid = NoteID(1);
+        let mut cards = vec![];
+        for queue in &[
+            CardQueue::New,
+            CardQueue::New,
+            CardQueue::Review,
+            CardQueue::Learn,
+        ] {
+            let mut card = Card::default();
+            card.note_id = nid;
+            card.queue = *queue;
+            col.add_card(&mut card).unwrap();
+            cards.push(card);
+        }
+        let queue_of = |col: &mut Collection, idx: usize| {
+            col.storage.get_card(cards[idx].id).unwrap().unwrap().queue
+        };
+
+        let out = col.bury_siblings(cards[0].id, nid, true, false).unwrap();
+        // learning cards are not siblings we care about
+        assert_eq!(out.new_card_ids, vec![cards[1].id.0]);
+        assert_eq!(out.review_card_ids, vec![cards[2].id.0]);
+        // only the new sibling should have been buried
+        assert_eq!(queue_of(&mut col, 1), CardQueue::SchedBuried);
+        assert_eq!(queue_of(&mut col, 2), CardQueue::Review);
+        assert_eq!(queue_of(&mut col, 3), CardQueue::Learn);
+
+        // nothing to bury, so the collection is left untouched
+        col.storage.set_modified_time(TimestampMillis(0)).unwrap();
+        let out = col.bury_siblings(cards[0].id, nid, false, false).unwrap();
+        assert_eq!(out.review_card_ids, vec![cards[2].id.0]);
+        assert_eq!(col.storage.get_modified_time().unwrap(), TimestampMillis(0));
+    }
 }
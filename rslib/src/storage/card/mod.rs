@@ -247,6 +247,35 @@ impl super::SqliteStorage {
             .collect()
     }
 
+    /// Cards from the provided decks that are ready to be placed in one of
+    /// the Python scheduler's queues. New cards arrive in due order, reviews
+    /// in due order with ties shuffled, and learning cards unordered.
+    pub(crate) fn queued_card_ids(
+        &self,
+        queue: CardQueue,
+        dids: &[DeckID],
+        today: u32,
+        limit: u32,
+    ) -> Result<Vec<CardID>> {
+        let (due_filter, order) = match queue {
+            CardQueue::New => ("", "order by due, ord"),
+            CardQueue::Review => ("and due <= ?1", "order by due, random()"),
+            _ => ("and due <= ?1", ""),
+        };
+        // the decks are bound rather than spliced in, so there is one
+        // statement per queue in the cache
+        let sql = format!(
+            "select id from cards where did in (select value from json_each(?3)) \
+             and queue = {} {} {} limit ?2",
+            queue as i8, due_filter, order
+        );
+        let dids = serde_json::to_string(dids)?;
+        self.db
+            .prepare_cached(&sql)?
+            .query_and_then(params![today, limit, dids], |r| Ok(CardID(r.get(0)?)))?
+            .collect()
+    }
+
     pub(crate) fn note_ids_of_cards(&self, cids: &[CardID]) -> Result<HashSet<NoteID>> {
         let mut stmt = self
             .db
@@ -412,7 +441,13 @@ impl super::SqliteStorage {
 
 #[cfg(test)]
 mod test {
-    use crate::{card::Card, i18n::I18n, log, storage::SqliteStorage};
+    use crate::{
+        card::{Card, CardID, CardQueue},
+        decks::DeckID,
+        i18n::I18n,
+        log,
+        storage::SqliteStorage,
+    };
     use std::path::Path;
 
     #[test]
@@ -425,4 +460,38 @@ mod test {
         storage.add_card(&mut card).unwrap();
         assert_ne!(id1, card.id);
     }
+
+    #[test]
+    fn queued_card_ids() {
+        let i18n = I18n::new(&[""], "", log::terminal());
+        let storage = SqliteStorage::open_or_create(Path::new(":memory:"), &i18n, false).unwrap();
+        let add = |did: i64, queue: CardQueue, due: i32, ord: u16| -> CardID {
+            let mut card = Card::default();
+            card.deck_id = DeckID(did);
+            card.queue = queue;
+            card.due = due;
+            card.template_idx = ord;
+            storage.add_card(&mut card).unwrap();
+            card.id
+        };
+        let new3 = add(1, CardQueue::New, 3, 0);
+        let new1_ord1 = add(1, CardQueue::New, 1, 1);
+        let new1_ord0 = add(1, CardQueue::New, 1, 0);
+        add(2, CardQueue::New, 0, 0);
+        let rev2 = add(1, CardQueue::Review, 2, 0);
+        let rev1 = add(1, CardQueue::Review, 1, 0);
+        add(1, CardQueue::Review, 3, 0);
+        let day_lrn2 = add(1, CardQueue::DayLearn, 2, 0);
+        add(1, CardQueue::DayLearn, 3, 0);
+
+        let dids = [DeckID(1)];
+        let today = 2;
+        let queued = |queue, limit| storage.queued_card_ids(queue, &dids, today, limit).unwrap();
+        // new cards ignore the due date, and are ordered by due then ordinal
+        assert_eq!(queued(CardQueue::New, 10), vec![new1_ord0, new1_ord1, new3]);
+        assert_eq!(queued(CardQueue::New, 2), vec![new1_ord0, new1_ord1]);
+        // reviews and day learning cards must be due
+        assert_eq!(queued(CardQueue::Review, 10), vec![rev1, rev2]);
+        assert_eq!(queued(CardQueue::DayLearn, 10), vec![day_lrn2]);
+    }
 }
@@ -42,6 +42,8 @@ fn open_or_create_collection_db(path: &Path) -> Result<Connection> {
     db.pragma_update(None, "cache_size", &(-40 * 1024))?;
     db.pragma_update(None, "legacy_file_format", &false)?;
     db.pragma_update(None, "journal_mode", &"wal")?;
+    // keep temporary tables and sorting/grouping scratch space off disk
+    db.pragma_update(None, "temp_store", &"memory")?;
 
     db.set_prepared_statement_cache_capacity(50);
 